@@ -17,10 +17,36 @@ This is for safely storing/exporting data. Bitwarden will NOT import this encryp
 from __future__ import annotations
 
 import argparse
+import base64
+import binascii
+import concurrent.futures
 import json
+import mmap
 import os
+import struct
+import time
+import warnings
 from pathlib import Path
-from typing import Any, Dict, List, Tuple
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+try:
+    # Rust JSON library: ~3-10x faster parse/dump than stdlib json and works
+    # directly in UTF-8 bytes, skipping the text-mode encode/decode pass.
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    # Streaming JSON parser; only needed for --stream mode.
+    import ijson
+except ImportError:
+    ijson = None
+
+try:
+    # Optional: vectorized prefix scan for very large exports.
+    import numpy
+except ImportError:
+    numpy = None
 
 try:
     from cryptography.fernet import Fernet, InvalidToken
@@ -31,18 +57,244 @@ except ImportError:
         "  python3 -m pip install --upgrade cryptography\n"
     )
 
+try:
+    # BatchFernet reimplements the Fernet token format on the hazmat layer.
+    from cryptography.exceptions import InvalidSignature
+    from cryptography.hazmat.primitives import hashes, padding
+    from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+    from cryptography.hazmat.primitives.hmac import HMAC
+except ImportError:
+    raise SystemExit(
+        "Missing dependency: cryptography\n\n"
+        "Install it with:\n"
+        "  python3 -m pip install --upgrade cryptography\n"
+    )
+
 ENC_PREFIX = "fernet:"
+ENC_PREFIX_B = b"fernet:"
+
+# Precomputed pieces of the prefix test. Checking the first character before
+# startswith short-circuits the common case (no prefix in encrypt mode) on a
+# single comparison instead of a 7-byte scan.
+_PFX = ENC_PREFIX
+_PFX_LEN = len(ENC_PREFIX)
+_PFX_FIRST = ENC_PREFIX[0]
+
+# Fernet tokens are base64 text; both str and bytes are accepted on decrypt.
+Token = Union[str, bytes]
+
+# Below this many values the fork + pickle cost of a process pool outweighs
+# the crypto work; stay serial.
+PARALLEL_THRESHOLD = 200
+
+# Below this many candidate strings a plain Python startswith loop beats
+# packing them into a numpy array first.
+VECTOR_THRESHOLD = 4096
+
+# IVs per os.urandom refill in the encrypt loop: one getrandom(2) syscall
+# covers this many tokens.
+IV_POOL_SIZE = 4096
+
+
+def _warn_if_no_aesni() -> None:
+    """
+    Warn once if the CPU does not advertise AES-NI.
+
+    OpenSSL's AES-CBC is roughly 4-10x slower in software than with the
+    hardware instructions, so running a big export in a container or VM
+    without AES-NI is a silent performance cliff worth surfacing. Linux
+    only; on other platforms (or unreadable /proc) nothing is reported.
+    """
+    try:
+        with open("/proc/cpuinfo", "r", encoding="ascii", errors="replace") as fp:
+            for line in fp:
+                if line.startswith("flags"):
+                    if "aes" not in line.split():
+                        warnings.warn(
+                            "AES-NI not detected on this CPU; Fernet encryption "
+                            "will be several times slower than on AES-NI hardware.",
+                            RuntimeWarning,
+                        )
+                    return
+    except OSError:
+        pass
+
+
+_warn_if_no_aesni()
+
+
+def _prefix_mask(values: List[str]) -> List[bool]:
+    """
+    Return a per-value mask: True where the value starts with ENC_PREFIX.
+
+    For large candidate lists the first 7 bytes of every value are packed
+    into one fixed-width numpy byte array and compared against b"fernet:"
+    in a single vectorized operation, replacing N Python-level startswith
+    calls with one C-level scan.
+    """
+    if numpy is not None and len(values) >= VECTOR_THRESHOLD:
+        heads = numpy.array([v[:7].encode("utf-8", "ignore") for v in values], dtype="S7")
+        return (heads == ENC_PREFIX_B).tolist()
+    return [len(v) >= _PFX_LEN and v[0] == _PFX_FIRST and v.startswith(_PFX) for v in values]
+
+
+def _encrypt_chunk(args: Tuple[bytes, List[bytes], int]) -> List[bytes]:
+    key, chunk, current_time = args
+    return BatchFernet(key)._encrypt_serial(chunk, current_time)
+
 
+def _decrypt_chunk(args: Tuple[bytes, List[Token]]) -> List[bytes]:
+    key, chunk = args
+    return BatchFernet(key)._decrypt_serial(chunk)
 
-def encrypt_str(f: Fernet, s: str) -> str:
-    return ENC_PREFIX + f.encrypt(s.encode("utf-8")).decode("ascii")
+
+class BatchFernet:
+    """
+    Fernet-compatible encrypt/decrypt for many small tokens.
+
+    cryptography.Fernet re-decodes the base64 key and rebuilds HMAC/Cipher
+    contexts on every encrypt()/decrypt() call. This splits the key once at
+    construction and reuses a pre-initialized HMAC context (via .copy()) per
+    token, so a loop over thousands of passwords/fields pays only the actual
+    AES + HMAC cost. Tokens are interchangeable with Fernet's.
+    """
+
+    def __init__(self, key: bytes) -> None:
+        try:
+            decoded = base64.urlsafe_b64decode(key)
+        except (TypeError, ValueError, binascii.Error):
+            raise ValueError("Fernet key must be 32 url-safe base64-encoded bytes.")
+        if len(decoded) != 32:
+            raise ValueError("Fernet key must be 32 url-safe base64-encoded bytes.")
+        self._key = bytes(key)  # kept for re-deriving in worker processes
+        self._signing_key = decoded[:16]
+        self._encryption_key = decoded[16:]
+        self._hmac_proto = HMAC(self._signing_key, hashes.SHA256())
+        self._pool: Optional[concurrent.futures.ProcessPoolExecutor] = None
+
+    def _map_parallel(self, worker, values: List[Any], *extra: Any) -> List[bytes]:
+        """Split values into per-CPU chunks and run worker across processes."""
+        n = os.cpu_count() or 1
+        step = -(-len(values) // n)  # ceil division
+        chunks = [values[i:i + step] for i in range(0, len(values), step)]
+        if self._pool is None:
+            # One long-lived pool per BatchFernet, created on first use and
+            # reused across batches: forking a fresh pool per call (as
+            # --stream does once per 1024-item flush) costs more than the
+            # crypto it parallelizes. Workers exit with the process.
+            self._pool = concurrent.futures.ProcessPoolExecutor(max_workers=n)
+        results = self._pool.map(worker, [(self._key, chunk) + extra for chunk in chunks])
+        return [token for chunk in results for token in chunk]
+
+    def close(self) -> None:
+        """Shut down the worker pool, if one was started."""
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def encrypt_many(self, messages: List[bytes]) -> List[bytes]:
+        # Pin the token timestamp once per batch; Fernet's default of
+        # int(time.time()) per token costs one time(2) call per value.
+        now = int(time.time())
+        if len(messages) >= PARALLEL_THRESHOLD and (os.cpu_count() or 1) > 1:
+            return self._map_parallel(_encrypt_chunk, messages, now)
+        return self._encrypt_serial(messages, now)
+
+    def decrypt_many(self, tokens: List[Token]) -> List[bytes]:
+        if len(tokens) >= PARALLEL_THRESHOLD and (os.cpu_count() or 1) > 1:
+            return self._map_parallel(_decrypt_chunk, tokens)
+        return self._decrypt_serial(tokens)
+
+    def _encrypt_serial(self, messages: List[bytes], current_time: Optional[int] = None) -> List[bytes]:
+        out: List[bytes] = []
+        if current_time is None:
+            current_time = int(time.time())
+        header = b"\x80" + struct.pack(">Q", current_time)
+        # Hoist attribute lookups and reusable objects out of the loop; each
+        # one otherwise costs a PyObject_GetAttr (or allocation) per token.
+        append = out.append
+        urandom = os.urandom
+        b64encode = base64.urlsafe_b64encode
+        hmac_copy = self._hmac_proto.copy
+        aes = algorithms.AES(self._encryption_key)
+        pkcs7 = padding.PKCS7(128)
+        cbc = modes.CBC
+        # Draw IVs from a pooled urandom buffer: one getrandom(2) syscall per
+        # IV_POOL_SIZE tokens instead of one per token.
+        pool = b""
+        pos = 0
+        remaining = len(messages)
+        for data in messages:
+            if pos == len(pool):
+                pool = urandom(16 * min(remaining, IV_POOL_SIZE))
+                pos = 0
+            iv = pool[pos:pos + 16]
+            pos += 16
+            remaining -= 1
+            padder = pkcs7.padder()
+            padded = padder.update(data) + padder.finalize()
+            encryptor = Cipher(aes, cbc(iv)).encryptor()
+            basic = header + iv + encryptor.update(padded) + encryptor.finalize()
+            h = hmac_copy()
+            h.update(basic)
+            append(b64encode(basic + h.finalize()))
+        return out
+
+    def _decrypt_serial(self, tokens: List[Token]) -> List[bytes]:
+        out: List[bytes] = []
+        # Hoist attribute lookups and reusable objects out of the loop; each
+        # one otherwise costs a PyObject_GetAttr (or allocation) per token.
+        append = out.append
+        b64decode = base64.urlsafe_b64decode
+        hmac_copy = self._hmac_proto.copy
+        aes = algorithms.AES(self._encryption_key)
+        pkcs7 = padding.PKCS7(128)
+        cbc = modes.CBC
+        for token in tokens:
+            try:
+                data = b64decode(token)
+            except (TypeError, ValueError, binascii.Error):
+                raise InvalidToken
+            if not data or data[0] != 0x80 or len(data) < 73:
+                raise InvalidToken
+            h = hmac_copy()
+            h.update(data[:-32])
+            try:
+                h.verify(data[-32:])
+            except InvalidSignature:
+                raise InvalidToken
+            iv = data[9:25]
+            decryptor = Cipher(aes, cbc(iv)).decryptor()
+            unpadder = pkcs7.unpadder()
+            try:
+                padded = decryptor.update(data[25:-32]) + decryptor.finalize()
+                append(unpadder.update(padded) + unpadder.finalize())
+            except ValueError:
+                raise InvalidToken
+        return out
+
+
+def encrypt_str(f: Fernet, s: str, current_time: Optional[int] = None) -> str:
+    # Concatenate in bytes space and decode once, instead of decoding the
+    # token and then building a second str for the prefix concat.
+    # Callers looping over many values should hoist int(time.time()) and pass
+    # it as current_time to avoid one time(2) call per token.
+    if current_time is not None:
+        try:
+            token = f.encrypt_at_time(s.encode("utf-8"), current_time)
+        except AttributeError:
+            token = f.encrypt(s.encode("utf-8"))
+    else:
+        token = f.encrypt(s.encode("utf-8"))
+    return (ENC_PREFIX_B + token).decode("ascii")
 
 
 def decrypt_str(f: Fernet, s: str) -> str:
     if not isinstance(s, str) or not s.startswith(ENC_PREFIX):
         return s
-    token = s[len(ENC_PREFIX):].encode("ascii")
-    return f.decrypt(token).decode("utf-8")
+    # Fernet.decrypt accepts str tokens directly; skipping .encode("ascii")
+    # saves one full copy per token.
+    return f.decrypt(s[len(ENC_PREFIX):]).decode("utf-8")
 
 
 def chmod_600(path: Path) -> None:
@@ -54,49 +306,118 @@ def chmod_600(path: Path) -> None:
 
 
 def load_json(path: Path) -> Dict[str, Any]:
-    with path.open("r", encoding="utf-8") as f:
-        data = json.load(f)
+    if orjson is not None:
+        # Parse straight out of the page cache via mmap: no intermediate
+        # read() copy of the whole file before the parser sees it.
+        with path.open("rb") as mf:
+            try:
+                mm = mmap.mmap(mf.fileno(), 0, access=mmap.ACCESS_READ)
+            except (ValueError, OSError):
+                # Empty files (and some filesystems) cannot be mapped.
+                data = orjson.loads(mf.read())
+            else:
+                with mm:
+                    data = orjson.loads(memoryview(mm))
+    else:
+        with path.open("r", encoding="utf-8") as f:
+            data = json.load(f)
     if not isinstance(data, dict) or "items" not in data or not isinstance(data["items"], list):
         raise ValueError("Input file does not look like a Bitwarden JSON export (missing top-level 'items' list).")
     return data
 
 
-def save_json(path: Path, data: Dict[str, Any]) -> None:
-    with path.open("w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
-        f.write("\n")
+def save_json(path: Path, data: Dict[str, Any], pretty: bool = False) -> None:
+    # Compact output by default: indent=2 roughly doubles the file size and
+    # the encode time, and Bitwarden's own exports are compact anyway.
+    if orjson is not None:
+        # One dump, one buffered write: orjson emits a single bytes object.
+        option = orjson.OPT_APPEND_NEWLINE
+        if pretty:
+            option |= orjson.OPT_INDENT_2
+        with path.open("wb", buffering=1 << 20) as f:
+            f.write(orjson.dumps(data, option=option))
+    else:
+        # json.dump issues many small writes; a 1 MiB buffer keeps them off
+        # the syscall path.
+        with path.open("w", encoding="utf-8", buffering=1 << 20) as f:
+            if pretty:
+                json.dump(data, f, ensure_ascii=False, indent=2)
+            else:
+                json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+            f.write("\n")
+
+
+def _collect_encrypt_work(
+    items: List[Dict[str, Any]],
+    work: List[Tuple[Dict[str, Any], str, bytes]],
+) -> None:
+    """Append (container, key, plaintext) for every value that needs encrypting."""
+    # EAFP: exports are regular, so assume the dict shape on the happy path
+    # and catch the rare abnormal item instead of isinstance-checking every
+    # level for every item.
+    candidates: List[Tuple[Dict[str, Any], str, str]] = []
+    for item in items:
+        # Passwords for login items (type == 1)
+        try:
+            if item.get("type") == 1:
+                login = item["login"]
+                pw = login["password"]
+                if type(pw) is str and pw:
+                    candidates.append((login, "password", pw))
+        except (KeyError, TypeError, AttributeError):
+            pass
+
+        # Hidden custom fields (field.type == 1). The outer try also covers
+        # a non-iterable "fields" value, which the inner per-field handler
+        # cannot see.
+        try:
+            for field in item.get("fields") or ():
+                try:
+                    if field.get("type") == 1:
+                        val = field["value"]
+                        if type(val) is str and val:
+                            candidates.append((field, "value", val))
+                except (KeyError, TypeError, AttributeError):
+                    pass
+        except (TypeError, AttributeError):
+            pass
+
+    # Bulk pre-partition: one (vectorized, when large) prefix scan drops the
+    # already-encrypted values instead of a per-value startswith test in the
+    # walk above.
+    mask = _prefix_mask([v for _, _, v in candidates])
+    work.extend(
+        (container, key, val.encode("utf-8"))
+        for (container, key, val), hit in zip(candidates, mask)
+        if not hit
+    )
+
+
+def _apply_encrypt_work(work: List[Tuple[Dict[str, Any], str, bytes]], f: BatchFernet) -> int:
+    """Batch-encrypt the collected plaintexts and write the tokens back."""
+    tokens = f.encrypt_many([pt for _, _, pt in work])
+    for (container, key, _), token in zip(work, tokens):
+        container[key] = ENC_PREFIX + token.decode("ascii")
+    return len(work)
 
 
-def encrypt_bitwarden(data: Dict[str, Any], f: Fernet) -> Tuple[Dict[str, Any], int]:
-    changed = 0
+def encrypt_bitwarden(data: Dict[str, Any], f: BatchFernet) -> Tuple[Dict[str, Any], int]:
     items: List[Dict[str, Any]] = data.get("items", [])
 
-    for item in items:
-        if not isinstance(item, dict):
-            continue
+    # Pass 1: walk the tree and collect (container, key, plaintext) work.
+    work: List[Tuple[Dict[str, Any], str, bytes]] = []
+    _collect_encrypt_work(items, work)
 
-        # Encrypt passwords for login items (type == 1)
-        if item.get("type") == 1:
-            login = item.get("login")
-            if isinstance(login, dict):
-                pw = login.get("password")
-                if isinstance(pw, str) and pw and not pw.startswith(ENC_PREFIX):
-                    login["password"] = encrypt_str(f, pw)
-                    changed += 1
-
-        # Encrypt hidden custom fields (field.type == 1)
-        fields = item.get("fields")
-        if isinstance(fields, list):
-            for field in fields:
-                if not isinstance(field, dict):
-                    continue
-                if field.get("type") == 1:
-                    val = field.get("value")
-                    if isinstance(val, str) and val and not val.startswith(ENC_PREFIX):
-                        field["value"] = encrypt_str(f, val)
-                        changed += 1
+    # Pass 2: batch-encrypt and write the tokens back.
+    changed = _apply_encrypt_work(work, f)
 
     # Mark as encrypted (informational)
+    _mark_encrypted(data)
+
+    return data, changed
+
+
+def _mark_encrypted(data: Dict[str, Any]) -> None:
     data["encrypted"] = True
     data.setdefault("encryption", {})
     if isinstance(data["encryption"], dict):
@@ -111,39 +432,235 @@ def encrypt_bitwarden(data: Dict[str, Any], f: Fernet) -> Tuple[Dict[str, Any],
             }
         )
 
-    return data, changed
 
+# --stream mode keeps about this many items in memory at a time instead of
+# the whole export. Large enough to keep batch crypto effective.
+STREAM_CHUNK_ITEMS = 1024
+
+
+def _read_header(fp) -> Tuple[Dict[str, Any], bool]:
+    """
+    Read the top-level keys of an export except 'items' (they are small),
+    walking the parse events so the items subtree is never materialized.
+    """
+    header: Dict[str, Any] = {}
+    saw_items = False
+    current = ""
+    builder = None
+    for prefix, event, value in ijson.parse(fp, use_float=True):
+        if prefix == "" and event == "map_key":
+            if builder is not None:
+                header[current] = builder.value
+                builder = None
+            current = value
+            if value == "items":
+                saw_items = True
+            else:
+                builder = ijson.ObjectBuilder()
+        elif prefix == "" and event in ("start_map", "end_map"):
+            continue
+        elif builder is not None:
+            builder.event(event, value)
+    if builder is not None:
+        header[current] = builder.value
+    return header, saw_items
+
+
+def _dump_item(item: Any) -> bytes:
+    # orjson indents from column 0; shift the block to sit under "items": [.
+    return b"    " + orjson.dumps(item, option=orjson.OPT_INDENT_2).replace(b"\n", b"\n    ")
+
+
+def _stream_transform(
+    in_path: Path,
+    out_path: Path,
+    mutate_header: Callable[[Dict[str, Any]], None],
+    transform_chunk: Callable[[List[Dict[str, Any]]], int],
+    pretty: bool = False,
+) -> int:
+    """
+    Fused read-transform-write pass over an export.
+
+    Items are parsed, transformed in place and written out in chunks of
+    STREAM_CHUNK_ITEMS, so peak memory stays roughly constant instead of
+    ~3x the file size, and each byte is touched once on the way in and
+    once on the way out. Top-level keys other than 'items' are written
+    first; 'items' is always emitted last.
+    """
+    with in_path.open("rb") as fp:
+        header, saw_items = _read_header(fp)
+    if not saw_items:
+        raise ValueError("Input file does not look like a Bitwarden JSON export (missing top-level 'items' list).")
+    mutate_header(header)
+    if pretty:
+        # Header minus its closing "\n}", then open the items list.
+        head = orjson.dumps(header, option=orjson.OPT_INDENT_2)[:-2] + b',\n  "items": [\n'
+        sep, tail = b",\n", b"\n  ]\n}\n"
+        dump_item = _dump_item
+    else:
+        head = orjson.dumps(header)[:-1] + b',"items":['
+        sep, tail = b",", b"]}\n"
+        dump_item = orjson.dumps
 
-def decrypt_bitwarden(data: Dict[str, Any], f: Fernet) -> Tuple[Dict[str, Any], int]:
     changed = 0
-    items: List[Dict[str, Any]] = data.get("items", [])
-
+    # Write to a sibling temp file and rename into place on success, so a
+    # failure mid-stream (e.g. wrong key) never leaves a half-written
+    # out_path behind.
+    tmp_path = out_path.with_name(out_path.name + ".tmp")
+    try:
+        with in_path.open("rb") as fp, tmp_path.open("wb") as out:
+            out.write(head)
+            first = True
+            chunk: List[Dict[str, Any]] = []
+
+            def flush() -> int:
+                nonlocal first
+                n = transform_chunk(chunk)
+                for item in chunk:
+                    if not first:
+                        out.write(sep)
+                    out.write(dump_item(item))
+                    first = False
+                chunk.clear()
+                return n
+
+            for item in ijson.items(fp, "items.item", use_float=True):
+                chunk.append(item)
+                if len(chunk) >= STREAM_CHUNK_ITEMS:
+                    changed += flush()
+            changed += flush()
+            out.write(tail)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+    os.replace(tmp_path, out_path)
+    return changed
+
+
+def encrypt_bitwarden_stream(in_path: Path, out_path: Path, f: BatchFernet, pretty: bool = False) -> int:
+    """Encrypt without holding the whole export in memory."""
+
+    def transform_chunk(chunk: List[Dict[str, Any]]) -> int:
+        work: List[Tuple[Dict[str, Any], str, bytes]] = []
+        _collect_encrypt_work(chunk, work)
+        return _apply_encrypt_work(work, f)
+
+    return _stream_transform(in_path, out_path, _mark_encrypted, transform_chunk, pretty=pretty)
+
+
+def _mark_decrypted(header: Dict[str, Any]) -> None:
+    header["encrypted"] = False
+
+
+def decrypt_bitwarden_stream(in_path: Path, out_path: Path, f: BatchFernet, pretty: bool = False) -> int:
+    """Decrypt without holding the whole export in memory."""
+
+    def transform_chunk(chunk: List[Dict[str, Any]]) -> int:
+        candidates = _collect_decrypt_candidates(chunk)
+        mask = _prefix_mask([v for _, _, v in candidates])
+        work: List[Tuple[Dict[str, Any], str, str]] = [
+            (container, key, val[_PFX_LEN:])
+            for (container, key, val), hit in zip(candidates, mask)
+            if hit
+        ]
+        return _apply_decrypt_work(work, f)
+
+    return _stream_transform(in_path, out_path, _mark_decrypted, transform_chunk, pretty=pretty)
+
+
+def _collect_decrypt_candidates(
+    items: List[Dict[str, Any]],
+) -> List[Tuple[Dict[str, Any], str, str]]:
+    """Collect (container, key, value) for every string that may be a token."""
+    # EAFP walk, same shape-tolerance as the encrypt side.
+    candidates: List[Tuple[Dict[str, Any], str, str]] = []
     for item in items:
-        if not isinstance(item, dict):
-            continue
-
-        if item.get("type") == 1:
-            login = item.get("login")
-            if isinstance(login, dict):
-                pw = login.get("password")
-                if isinstance(pw, str) and pw.startswith(ENC_PREFIX):
-                    login["password"] = decrypt_str(f, pw)
-                    changed += 1
-
-        fields = item.get("fields")
-        if isinstance(fields, list):
-            for field in fields:
-                if not isinstance(field, dict):
-                    continue
-                val = field.get("value")
-                if isinstance(val, str) and val.startswith(ENC_PREFIX):
-                    field["value"] = decrypt_str(f, val)
-                    changed += 1
+        try:
+            if item.get("type") == 1:
+                login = item["login"]
+                pw = login["password"]
+                if type(pw) is str:
+                    candidates.append((login, "password", pw))
+        except (KeyError, TypeError, AttributeError):
+            pass
+
+        # Outer try also covers a non-iterable "fields" value.
+        try:
+            for field in item.get("fields") or ():
+                try:
+                    val = field["value"]
+                    if type(val) is str:
+                        candidates.append((field, "value", val))
+                except (KeyError, TypeError, AttributeError):
+                    pass
+        except (TypeError, AttributeError):
+            pass
+    return candidates
+
+
+def _apply_decrypt_work(work: List[Tuple[Dict[str, Any], str, str]], f: BatchFernet) -> int:
+    """Batch-decrypt the collected tokens and write the plaintexts back."""
+    plaintexts = f.decrypt_many([tok for _, _, tok in work])
+    for (container, key, _), plaintext in zip(work, plaintexts):
+        container[key] = plaintext.decode("utf-8")
+    return len(work)
+
+
+def decrypt_bitwarden(data: Dict[str, Any], f: BatchFernet) -> Tuple[Dict[str, Any], int]:
+    # Pass 1: walk the tree and collect candidate strings, then one
+    # (vectorized, when large) prefix scan selects what actually needs
+    # decrypting.
+    candidates = _collect_decrypt_candidates(data.get("items", []))
+    mask = _prefix_mask([v for _, _, v in candidates])
+    # b64decode (and Fernet) accept str tokens, so the slice is passed as-is
+    # rather than paying an .encode("ascii") copy per token.
+    work: List[Tuple[Dict[str, Any], str, str]] = [
+        (container, key, val[_PFX_LEN:])
+        for (container, key, val), hit in zip(candidates, mask)
+        if hit
+    ]
+
+    # Pass 2: batch-decrypt and write the plaintexts back.
+    changed = _apply_decrypt_work(work, f)
 
     data["encrypted"] = False
     return data, changed
 
 
+def process_file(
+    in_path: Path,
+    out_path: Path,
+    key: bytes,
+    op: str = "encrypt",
+    stream: bool = False,
+    pretty: bool = False,
+) -> int:
+    """
+    Encrypt or decrypt one export file; returns the number of values changed.
+
+    Library entry point: embedders and batch jobs that process many files
+    should call this in a loop. Interpreter startup and key validation are
+    then paid once per process instead of once per file, which dominates
+    wall time when re-invoking the CLI on many small vaults.
+    """
+    f = BatchFernet(key)
+    try:
+        if op == "decrypt":
+            if stream:
+                return decrypt_bitwarden_stream(in_path, out_path, f, pretty=pretty)
+            data, changed = decrypt_bitwarden(load_json(in_path), f)
+        elif op == "encrypt":
+            if stream:
+                return encrypt_bitwarden_stream(in_path, out_path, f, pretty=pretty)
+            data, changed = encrypt_bitwarden(load_json(in_path), f)
+        else:
+            raise ValueError(f"op must be 'encrypt' or 'decrypt', got {op!r}")
+        save_json(out_path, data, pretty=pretty)
+        return changed
+    finally:
+        f.close()
+
+
 def main() -> int:
     p = argparse.ArgumentParser(description="Encrypt/decrypt Bitwarden JSON export passwords + hidden fields.")
     p.add_argument("input", type=Path, help="Path to Bitwarden JSON export (e.g. bitwarden_export_*.json)")
@@ -155,13 +672,18 @@ def main() -> int:
     mode.add_argument("--encrypt", action="store_true", help="Encrypt (default)")
 
     p.add_argument("--keyfile", type=Path, default=None, help="Key file to use (required for --decrypt; optional for encrypt)")
+    p.add_argument("--stream", action="store_true",
+                   help="Stream items instead of loading the whole export (for very large files; needs ijson + orjson)")
+    p.add_argument("--pretty", action="store_true",
+                   help="Indent the output JSON (default is compact, ~half the size and write time)")
     args = p.parse_args()
 
     in_path: Path = args.input
     if not in_path.exists():
         raise SystemExit(f"Input file not found: {in_path}")
 
-    data = load_json(in_path)
+    if args.stream and (ijson is None or orjson is None):
+        raise SystemExit("--stream requires the ijson and orjson packages (python3 -m pip install ijson orjson)")
 
     # Build output filenames
     stem = in_path.stem
@@ -180,12 +702,10 @@ def main() -> int:
 
     if args.decrypt:
         key_bytes = key_path.read_bytes().strip()
-        f = Fernet(key_bytes)
         try:
-            data2, changed = decrypt_bitwarden(data, f)
+            changed = process_file(in_path, out_json, key_bytes, op="decrypt", stream=args.stream, pretty=args.pretty)
         except InvalidToken:
             raise SystemExit("Decryption failed: wrong key file or file content is corrupted.")
-        save_json(out_json, data2)
         print(f"Wrote: {out_json} (decrypted values: {changed})")
         return 0
 
@@ -206,9 +726,7 @@ def main() -> int:
         )
         chmod_600(key_path)
 
-    f = Fernet(key)
-    data2, changed = encrypt_bitwarden(data, f)
-    save_json(out_json, data2)
+    changed = process_file(in_path, out_json, key, op="encrypt", stream=args.stream, pretty=args.pretty)
     print(f"Wrote: {out_json} (encrypted values: {changed})")
     print(f"Wrote: {key_path}")
     return 0